@@ -1,15 +1,175 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import re
 import os
-from textblob import TextBlob
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.decomposition import LatentDirichletAllocation
-from wordcloud import WordCloud
+import io
+from collections import Counter
+from textblob.sentiments import PatternAnalyzer
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import MiniBatchNMF
+from wordcloud import WordCloud, STOPWORDS
 import matplotlib.pyplot as plt
 from prophet import Prophet
 from fpdf import FPDF
 
+
+# Complaint categories in the order categorize() checks them, followed by the fallbacks
+CATEGORY_NAMES = ["Billing", "Network", "Performance", "Customer Service", "Other", "Unknown"]
+OTHER_CODE = CATEGORY_NAMES.index("Other")
+UNKNOWN_CODE = CATEGORY_NAMES.index("Unknown")
+
+
+def categorize(text):
+    # Return the CATEGORY_NAMES code of an already lowercased description;
+    # keyword groups are checked in priority order and the first match wins
+    if "bill" in text or "refund" in text:
+        return 0
+    if "network" in text or "signal" in text:
+        return 1
+    if "slow" in text or "speed" in text:
+        return 2
+    if "service" in text or "support" in text or "rude" in text:
+        return 3
+    return OTHER_CODE
+
+
+# Words for the word cloud; surrounding punctuation is not part of a word, but
+# contractions stay whole so STOPWORDS entries like "don't" still match
+WORD_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+# Tables only ship this many rows to the browser; summaries still use the full frame
+MAX_DISPLAY_ROWS = 1000
+
+# Columns the analysis reads; everything else is skipped while parsing
+USED_COLUMNS = {'date', 'complainttype', 'description', 'latitude', 'longitude'}
+
+
+def clean_column_name(col):
+    return col.strip().replace(" ", "_").lower()
+
+
+# TextBlob loads its sentiment lexicon once at import, so building the
+# analyzer itself is cheap; it is called directly rather than through a TextBlob per row.
+SENTIMENT_ANALYZER = PatternAnalyzer()
+
+
+# Fitting Prophet takes seconds, so the model is reused until the daily history changes;
+# each filter combination fits its own model, so only the most recent few are kept
+@st.cache_resource(show_spinner=False, max_entries=8)
+def fit_forecast_model(history):
+    model = Prophet()
+    model.fit(history)
+    return model
+
+
+# Word counts for the word cloud, built without joining the whole corpus into one string.
+# The cache is keyed on the raw file bytes plus the packed filter mask, both hashed in full;
+# the descriptions themselves are not hashed (leading underscore). Every filter
+# combination adds an entry, so only the most recent few are kept.
+@st.cache_data(show_spinner=False, max_entries=8)
+def word_frequencies(raw, selection, _descriptions):
+    counts = Counter()
+    for text in _descriptions:
+        counts.update(word for word in WORD_PATTERN.findall(text) if word not in STOPWORDS)
+    return dict(counts)
+
+
+# Topics are refit only when the file or the filters change; keyed like word_frequencies,
+# so cache hits skip both hashing and preprocessing the descriptions
+@st.cache_data(show_spinner=False, max_entries=8)
+def extract_topics(raw, selection, _descriptions, max_topics=5, num_keywords=10):
+    # Skip blank descriptions; None means there was no text to model
+    texts = [text for text in _descriptions if text.strip()]
+    if not texts:
+        return None
+
+    # The token pattern only keeps alphabetic words, so punctuation needs no separate pass
+    vectorizer = TfidfVectorizer(
+        max_df=0.9,
+        min_df=2,
+        stop_words='english',
+        lowercase=False,
+        token_pattern=r"(?u)\b[a-z][a-z]+\b"
+    )
+    doc_term_matrix = vectorizer.fit_transform(texts)
+
+    # Adjust n_components if the number of documents is less than max_topics
+    n_components = min(max_topics, doc_term_matrix.shape[0])
+    if n_components == 0:
+        return []
+    nmf = MiniBatchNMF(n_components=n_components, random_state=42, batch_size=256)
+    nmf.fit(doc_term_matrix)
+
+    words = vectorizer.get_feature_names_out()
+    # Ensure there are enough words to pick from
+    num_keywords = min(num_keywords, len(words))
+    return [[str(words[j]) for j in topic.argsort()[-num_keywords:]] for topic in nmf.components_]
+
+
+# Derived columns for the full frame; filters later only index into them
+def enrich(df):
+    if 'description' not in df.columns:
+        return df
+
+    descriptions = df['description'].fillna("").astype(str)
+
+    # Lowercase descriptions once; keyword search, categorization and topic modeling share it
+    desc_lower = descriptions.str.lower()
+
+    # Score each distinct description once and broadcast the scores back to
+    # every row; missing descriptions score 0 (Neutral)
+    codes, unique_descriptions = pd.factorize(descriptions)
+    polarity = np.fromiter(
+        (SENTIMENT_ANALYZER.analyze(text).polarity for text in unique_descriptions),
+        dtype=np.float64,
+        count=len(unique_descriptions)
+    )[codes]
+    sentiment = np.select(
+        [polarity > 0.1, polarity < -0.1],
+        ["Positive", "Negative"],
+        default="Neutral"
+    )
+
+    # Plain substring checks per description; the codes go straight into a Categorical
+    lowered = desc_lower.tolist()
+    category_codes = np.fromiter((categorize(text) for text in lowered), dtype=np.intp, count=len(lowered))
+    category_codes[df['description'].isna().to_numpy()] = UNKNOWN_CODE
+
+    return df.assign(
+        _desc_lower=desc_lower,
+        sentiment=sentiment,
+        category=pd.Categorical.from_codes(category_codes, categories=CATEGORY_NAMES)
+    )
+
+
+# Parsing, cleaning and the derived columns are all keyed on the raw file bytes,
+# so reruns reuse the enriched frame and a changed file is always reprocessed
+@st.cache_data(show_spinner=False)
+def load_and_clean(raw):
+    # Read only the header first so unused columns are never materialized
+    header = pd.read_csv(io.BytesIO(raw), nrows=0).columns
+    usecols = [col for col in header if clean_column_name(col) in USED_COLUMNS] or None
+    df = pd.read_csv(io.BytesIO(raw), engine='pyarrow', usecols=usecols)
+
+    # Clean column names
+    df.columns = [clean_column_name(col) for col in df.columns]
+
+    # Convert 'date' to datetime; ISO dates skip per-row format inference,
+    # anything else falls back to the slower inferred parse
+    if 'date' in df.columns:
+        dates = pd.to_datetime(df['date'], errors='coerce', format='ISO8601', cache=True)
+        if dates.isna().all() and df['date'].notna().any():
+            dates = pd.to_datetime(df['date'], errors='coerce', format='mixed', cache=True)
+        df['date'] = dates
+
+    # Complaint types repeat heavily; categorical codes make filtering and counting cheap
+    if 'complainttype' in df.columns:
+        df['complainttype'] = df['complainttype'].astype('category')
+
+    return enrich(df)
+
+
 st.set_page_config(page_title="Service Complaints Analyzer", layout="wide")
 st.title("Service Complaints Analyzer")
 
@@ -17,8 +177,9 @@ uploaded_file = st.file_uploader("Upload your complaints CSV file", type=["csv"]
 
 # Use uploaded CSV or fallback to local CSV
 if uploaded_file is not None:
+    raw = uploaded_file.getvalue()
     try:
-        df = pd.read_csv(uploaded_file)
+        df = load_and_clean(raw)
     except Exception as e:
         st.error(f"Error reading the uploaded file: {e}")
         df = None
@@ -30,7 +191,9 @@ else:
     fallback_path = "data/complaints.csv"
     if os.path.exists(fallback_path):
         st.info("No file uploaded. Using fallback sample data from 'data/complaints.csv'.")
-        df = pd.read_csv(fallback_path)
+        with open(fallback_path, "rb") as f:
+            raw = f.read()
+        df = load_and_clean(raw)
     else:
         st.warning("No file uploaded and fallback file not found.")
         st.info("Please upload a CSV file with 'date', 'complainttype', and 'description' columns.")
@@ -38,16 +201,12 @@ else:
 
 # Continue only if data is valid
 if df is not None and not df.empty:
-    # Clean column names
-    df.columns = [col.strip().replace(" ", "_").lower() for col in df.columns]
-
-    # Convert 'date' to datetime
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-
     # --- Sidebar filters ---
     st.sidebar.header("Filters")
 
+    # Every filter narrows one boolean mask; the frame is sliced once at the end
+    mask = np.ones(len(df), dtype=bool)
+
     # Date filter
     if 'date' in df.columns and df['date'].notna().any():
         min_date_available = df['date'].min().date()
@@ -56,7 +215,13 @@ if df is not None and not df.empty:
             "Filter by Date Range",
             [min_date_available, max_date_available]
         )
-        df = df[(df['date'].dt.date >= start_date) & (df['date'].dt.date <= end_date)]
+        # Compare against a half-open timestamp range so the filter runs on the datetime64 values;
+        # bounds take the column's timezone so tz-aware dates compare, and the end bound
+        # adds a calendar day so DST transitions don't shift it
+        date_tz = df['date'].dt.tz
+        start_ts = pd.Timestamp(start_date, tz=date_tz)
+        end_ts = pd.Timestamp(end_date, tz=date_tz) + pd.DateOffset(days=1)
+        mask &= ((df['date'] >= start_ts) & (df['date'] < end_ts)).to_numpy()
     else:
         st.sidebar.warning("Date column not found or contains no valid dates for filtering.")
 
@@ -64,14 +229,14 @@ if df is not None and not df.empty:
     # Complaint Type filter
     if 'complainttype' in df.columns:
         # Ensure unique and non-null complaint types
-        complaint_options = df['complainttype'].dropna().unique().tolist()
+        complaint_options = df.loc[mask, 'complainttype'].dropna().unique().tolist()
         if complaint_options: # Only show multiselect if there are options
             selected_types = st.sidebar.multiselect(
                 "Filter by Complaint Type",
                 complaint_options,
                 default=complaint_options
             )
-            df = df[df['complainttype'].isin(selected_types)]
+            mask &= df['complainttype'].isin(selected_types).to_numpy()
         else:
             st.sidebar.info("No valid complaint types found.")
     else:
@@ -80,45 +245,38 @@ if df is not None and not df.empty:
 
     # Keyword Search
     keyword = st.sidebar.text_input("Search Description Keyword").strip().lower()
-    if keyword and 'description' in df.columns:
-        df = df[df['description'].astype(str).str.lower().str.contains(keyword, na=False)] # Use .astype(str) to handle non-string types
+    if keyword and '_desc_lower' in df.columns:
+        # Plain substring search over the still-selected descriptions; regex=False
+        # avoids compiling the keyword and treats characters like '.' literally
+        mask[mask] = df.loc[mask, '_desc_lower'].str.contains(keyword, regex=False).to_numpy()
 
 
     # --- Sentiment Analysis ---
-    if 'description' in df.columns:
-        def get_sentiment(text):
-            # Ensure text is a string before passing to TextBlob
-            if pd.isna(text):
-                return "Neutral" # Or "N/A", depending on how you want to handle missing descriptions
-            blob = TextBlob(str(text))
-            polarity = blob.sentiment.polarity
-            if polarity > 0.1:
-                return "Positive"
-            elif polarity < -0.1:
-                return "Negative"
-            else:
-                return "Neutral"
-
-        df['sentiment'] = df['description'].apply(get_sentiment)
-
+    if 'sentiment' in df.columns:
         # Sentiment Filter
         sentiment_options = ['Positive', 'Neutral', 'Negative']
         selected_sentiments = st.sidebar.multiselect("Filter by Sentiment", sentiment_options, default=sentiment_options)
-        df = df[df['sentiment'].isin(selected_sentiments)]
+        mask &= df['sentiment'].isin(selected_sentiments).to_numpy()
     else:
         st.warning("Cannot perform sentiment analysis. 'description' column missing.")
 
+    df = df.loc[mask]
+    # Cache key for the filtered rows; packed to bytes so Streamlit hashes it in full
+    selection = np.packbits(mask).tobytes()
+
 
     # --- Display Section ---
     st.subheader("Raw Data")
-    st.dataframe(df)
+    st.dataframe(df.head(MAX_DISPLAY_ROWS).drop(columns='_desc_lower', errors='ignore'))
+    if len(df) > MAX_DISPLAY_ROWS:
+        st.caption(f"Showing first {MAX_DISPLAY_ROWS} rows of {len(df)} total.")
 
     st.subheader("Complaint Summary")
     st.write(f"Total complaints: {len(df)}")
 
     if 'complainttype' in df.columns:
         st.write("Top 5 Complaint Types:")
-        st.dataframe(df['complainttype'].value_counts().head())
+        st.dataframe(df['complainttype'].value_counts().loc[lambda counts: counts > 0].head())
 
     if 'date' in df.columns and df['date'].notna().any():
         st.write(f"Date range: {df['date'].min().date()} to {df['date'].max().date()}")
@@ -127,30 +285,11 @@ if df is not None and not df.empty:
 
 
     # --- Categorize complaints ---
-    if 'description' in df.columns:
-        def categorize(text):
-            # Ensure text is a string
-            if pd.isna(text):
-                return "Unknown"
-            text = str(text).lower()
-            if "bill" in text or "refund" in text:
-                return "Billing"
-            elif "network" in text or "signal" in text:
-                return "Network"
-            elif "slow" in text or "speed" in text:
-                return "Performance"
-            elif "service" in text or "support" in text or "rude" in text:
-                return "Customer Service"
-            else:
-                return "Other"
-
-        df['category'] = df['description'].apply(categorize)
-
+    if 'category' in df.columns:
+        # The category column is already part of the raw data table above
         st.subheader("Complaint Categorization")
-        st.dataframe(df[['description', 'category']])
-
         st.write("Top Complaint Categories")
-        st.bar_chart(df['category'].value_counts())
+        st.bar_chart(df['category'].value_counts().loc[lambda counts: counts > 0])
     else:
         st.warning("Cannot categorize complaints. 'description' column missing.")
 
@@ -173,8 +312,8 @@ if df is not None and not df.empty:
     if 'description' in df.columns:
         st.subheader("Word Cloud of Complaint Descriptions")
 
-        text = " ".join(df['description'].dropna().astype(str).tolist())
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
+        frequencies = word_frequencies(raw, selection, df['_desc_lower'])
+        wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(frequencies)
 
         fig, ax = plt.subplots(figsize=(10, 5))
         ax.imshow(wordcloud, interpolation='bilinear')
@@ -187,12 +326,11 @@ if df is not None and not df.empty:
 if 'date' in df.columns:
     st.subheader("Complaint Volume Forecast (Next 30 Days)")
 
-    forecast_df = df['date'].value_counts().reset_index()
-    forecast_df.columns = ['ds', 'y']
-    forecast_df = forecast_df.sort_values('ds')
+    # Daily counts, sorted by date before they reach Prophet
+    daily_counts = df['date'].dropna().dt.floor('D').value_counts().sort_index()
+    forecast_df = pd.DataFrame({'ds': daily_counts.index, 'y': daily_counts.to_numpy()})
 
-    model = Prophet()
-    model.fit(forecast_df)
+    model = fit_forecast_model(forecast_df)
 
     future = model.make_future_dataframe(periods=30)
     forecast = model.predict(future)
@@ -210,7 +348,7 @@ if 'date' in df.columns:
         pdf.cell(200, 10, txt=f"Total Complaints: {len(df)}", ln=True)
 
     if 'complainttype' in df.columns:
-        top_types = df['complainttype'].value_counts().head().to_dict()
+        top_types = df['complainttype'].value_counts().loc[lambda counts: counts > 0].head().to_dict()
         for t, v in top_types.items():
             pdf.cell(200, 10, txt=f"{t}: {v}", ln=True)
 
@@ -230,53 +368,35 @@ if 'date' in df.columns:
     # --- Trend Analysis ---
     st.subheader("Complaint Trend Over Time")
     if 'date' in df.columns and df['date'].notna().any():
-        trend_df = df[df['date'].notna()]
-        trend_daily = trend_df.groupby('date').size().reset_index(name='count')
-        st.line_chart(trend_daily.set_index('date'))
+        trend_dates = df['date'].dropna()
+        trend_daily = trend_dates.dt.floor('D').value_counts().sort_index()
+        st.line_chart(trend_daily.rename_axis('date').to_frame('count'))
 
-        # Ensure 'month' column is created only if 'date' is valid
-        trend_df['month'] = trend_df['date'].dt.to_period('M').astype(str)
-        trend_monthly = trend_df.groupby('month').size().reset_index(name='count')
+        # Count on the monthly periods directly and only format the few resulting labels
+        monthly = trend_dates.dt.to_period('M').value_counts(sort=False).sort_index()
+        trend_monthly = pd.DataFrame({'month': monthly.index.astype(str), 'count': monthly.to_numpy()})
         st.subheader("Monthly Complaint Trend")
         st.bar_chart(trend_monthly.set_index('month'))
     else:
         st.warning("Cannot display trend. 'date' column missing or not parsable.")
 
 
-    # --- Complaint Topic Modeling (LDA) ---
+    # --- Complaint Topic Modeling (NMF) ---
     if 'description' in df.columns and not df['description'].empty:
-        st.subheader("Complaint Topic Modeling (LDA)")
-
-        # Preprocessing: Fill NaN with empty string, convert to lower, remove non-alphanumeric
-        cleaned_text = df['description'].fillna("").astype(str).str.lower().str.replace(r'[^\w\s]', '', regex=True)
-
-        # Filter out empty strings after cleaning, otherwise CountVectorizer might throw errors
-        cleaned_text = cleaned_text[cleaned_text.str.strip() != '']
-
-        if not cleaned_text.empty:
-            vectorizer = CountVectorizer(max_df=0.9, min_df=2, stop_words='english')
-            try:
-                doc_term_matrix = vectorizer.fit_transform(cleaned_text)
-
-                # Adjust n_components if the number of documents is less than 5
-                n_components = min(5, doc_term_matrix.shape[0])
-                if n_components > 0:
-                    lda = LatentDirichletAllocation(n_components=n_components, random_state=42)
-                    lda.fit(doc_term_matrix)
-
-                    words = vectorizer.get_feature_names_out()
-                    for i, topic in enumerate(lda.components_):
-                        st.write(f"**Topic {i+1}**:")
-                        # Ensure there are enough words to pick from
-                        num_keywords = min(10, len(words))
-                        topic_keywords = [words[j] for j in topic.argsort()[-num_keywords:]]
-                        st.write(", ".join(topic_keywords))
-                else:
-                    st.info("Not enough data after preprocessing to perform LDA topic modeling with 5 components.")
-            except ValueError as ve:
-                st.warning(f"Could not perform LDA topic modeling. Error: {ve}. This often happens if there's not enough unique text data after filtering.")
-        else:
-            st.info("No valid text data in 'description' column after preprocessing for LDA.")
+        st.subheader("Complaint Topic Modeling (NMF)")
+
+        try:
+            topics = extract_topics(raw, selection, df['_desc_lower'])
+            if topics is None:
+                st.info("No valid text data in 'description' column after preprocessing for topic modeling.")
+            elif topics:
+                for i, topic_keywords in enumerate(topics):
+                    st.write(f"**Topic {i+1}**:")
+                    st.write(", ".join(topic_keywords))
+            else:
+                st.info("Not enough data after preprocessing to perform topic modeling with 5 components.")
+        except ValueError as ve:
+            st.warning(f"Could not perform topic modeling. Error: {ve}. This often happens if there's not enough unique text data after filtering.")
     else:
         st.warning("Cannot perform Topic Modeling. 'description' column missing or empty.")
 